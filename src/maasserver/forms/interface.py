@@ -34,6 +34,7 @@ from maasserver.models.interface import (
     PhysicalInterface,
     VLANInterface,
 )
+from maasserver.models.timestampedmodel import now
 from maasserver.utils.forms import compose_invalid_choice_text
 
 
@@ -48,6 +49,19 @@ class InterfaceForm(MAASModelForm):
 
     parents = forms.ModelMultipleChoiceField(queryset=None, required=False)
 
+    # Rules checked by `clean_parents`, set by the specialized forms. The
+    # number of parents must be within `_parent_count_range` (a maximum of
+    # None means no limit), no parent can be one of the
+    # `_forbidden_parent_types`, and no parent can already have a child
+    # (other than this interface) of one of the `_forbidden_sibling_types`.
+    # Each error may refer to the interface type as "%(type)s".
+    _parent_count_range = (0, None)
+    _parent_count_error = None
+    _forbidden_parent_types = frozenset()
+    _forbidden_parent_type_error = None
+    _forbidden_sibling_types = frozenset()
+    _forbidden_sibling_error = None
+
     # Linux doesn't allow lower than 552 for the MTU.
     mtu = forms.IntegerField(min_value=552, required=False)
 
@@ -72,12 +86,12 @@ class InterfaceForm(MAASModelForm):
 
     @staticmethod
     def get_interface_form(type):
-        try:
-            return INTERFACE_FORM_MAPPING[type]
-        except KeyError:
+        form = INTERFACE_FORM_MAPPING.get(type)
+        if form is None:
             raise ValidationError(
                 {"type": ["Invalid interface type '%s'." % type]}
             )
+        return form
 
     class Meta:
         model = Interface
@@ -102,7 +116,18 @@ class InterfaceForm(MAASModelForm):
             raise ValueError(
                 "instance or node is required for the InterfaceForm"
             )
-        self.fields["parents"].queryset = self.node.interface_set.all()
+        # Parent validation walks the VLAN and the children of each parent,
+        # so fetch them along with the parents instead of once per parent.
+        # Only the columns used by validation are loaded; accessing any
+        # other field on a parent raises DeferredValueAccessError.
+        parents_qs = (
+            self.node.interface_set.only(
+                "id", "name", "type", "node", "vlan", "mac_address"
+            )
+            .select_related("vlan")
+            .prefetch_related("children_relationships__child")
+        )
+        self.fields["parents"].queryset = parents_qs
 
     def _get_validation_exclusions(self):
         # The instance is created just before this in django. The only way to
@@ -120,36 +145,79 @@ class InterfaceForm(MAASModelForm):
             existing_parents = set(interface.parents.all())
             if parents:
                 parents = set(parents)
-                for parent_to_add in parents.difference(existing_parents):
-                    rel = InterfaceRelationship(
-                        child=interface, parent=parent_to_add
+                parents_to_add = parents.difference(existing_parents)
+                parents_to_del = existing_parents.difference(parents)
+                if parents_to_add:
+                    # Insert all new relationships in 1 query.
+                    created_at = now()
+                    InterfaceRelationship.objects.bulk_create(
+                        [
+                            InterfaceRelationship(
+                                child=interface,
+                                parent=parent_to_add,
+                                created=created_at,
+                                updated=created_at,
+                            )
+                            for parent_to_add in parents_to_add
+                        ]
                     )
-                    rel.save()
-                for parent_to_del in existing_parents.difference(parents):
-                    rel = interface.parent_relationships.filter(
-                        parent=parent_to_del
-                    )
-                    rel.delete()
+                if parents_to_del:
+                    interface.parent_relationships.filter(
+                        parent__in=parents_to_del
+                    ).delete()
         # Allow setting the VLAN to None.
         new_vlan = self.cleaned_data.get("vlan")
         vlan_was_set = "vlan" in self.data
         if new_vlan is None and vlan_was_set:
             interface.vlan = new_vlan
         self.set_extra_parameters(interface, created)
+        # CleanSave only writes the fields that changed, so this issues no
+        # UPDATE when neither the VLAN nor the params were modified.
         interface.save()
         if created:
             interface.ensure_link_up()
-        return Interface.objects.get(id=interface.id)
+        return interface
 
     def fields_ok(self, field_list):
         """Return True if none of the fields is in error thus far."""
         return all(field not in self.errors for field in field_list)
 
     def get_clean_parents(self):
+        # Submitted parents come from the field queryset and only have the
+        # fields loaded in __init__; the existing parents are full instances.
         if "parents" in self.data or self.instance.id is None:
             parents = self.cleaned_data.get("parents")
         else:
-            parents = self.instance.parents.all()
+            parents = self.instance.parents.all().prefetch_related(
+                "children_relationships__child"
+            )
+        return parents
+
+    def clean_parents(self):
+        """Validate the parents against the rules of the specialized form."""
+        parents = self.get_clean_parents()
+        if parents is None:
+            return
+        interface_type = {"type": self.Meta.model.get_type()}
+        min_parents, max_parents = self._parent_count_range
+        if len(parents) < min_parents or (
+            max_parents is not None and len(parents) > max_parents
+        ):
+            raise ValidationError(self._parent_count_error % interface_type)
+        instance_id = None if self.instance is None else self.instance.id
+        for parent in parents:
+            if parent.type in self._forbidden_parent_types:
+                raise ValidationError(
+                    self._forbidden_parent_type_error % interface_type
+                )
+            if self._forbidden_sibling_types and any(
+                rel.child.type in self._forbidden_sibling_types
+                and rel.child_id != instance_id
+                for rel in parent.children_relationships.all()
+            ):
+                raise ValidationError(
+                    self._forbidden_sibling_error % interface_type
+                )
         return parents
 
     def clean_interface_name_uniqueness(self, name):
@@ -165,7 +233,16 @@ class InterfaceForm(MAASModelForm):
 
     def clean_parents_all_same_node(self, parents):
         if parents:
-            parent_nodes = set(parent.get_node() for parent in parents)
+            # Compare the node IDs on the parent rows, so that the node of
+            # each parent isn't fetched. Only parents without a node need
+            # get_node() to find it through their own parents.
+            parent_nodes = set()
+            for parent in parents:
+                node_id = parent.node_id
+                if node_id is None:
+                    node = parent.get_node()
+                    node_id = None if node is None else node.id
+                parent_nodes.add(node_id)
             if len(parent_nodes) > 1:
                 msg = "Parents are related to different nodes."
                 set_form_error(self, "name", msg)
@@ -314,6 +391,9 @@ class PhysicalInterfaceForm(InterfaceForm, NUMANodeFormMixin):
         required=False, min_value=0, label="NUMA node"
     )
 
+    _parent_count_range = (0, 0)
+    _parent_count_error = "A physical interface cannot have parents."
+
     class Meta:
         model = PhysicalInterface
         fields = InterfaceForm.Meta.fields + (
@@ -332,13 +412,6 @@ class PhysicalInterfaceForm(InterfaceForm, NUMANodeFormMixin):
         # Allow the name to be auto-generated if missing.
         self.fields["name"].required = False
 
-    def clean_parents(self):
-        parents = self.get_clean_parents()
-        if parents is None:
-            return
-        if len(parents) > 0:
-            raise ValidationError("A physical interface cannot have parents.")
-
     def clean(self):
         cleaned_data = InterfaceForm.clean(self)
         new_name = cleaned_data.get("name")
@@ -354,35 +427,21 @@ class PhysicalInterfaceForm(InterfaceForm, NUMANodeFormMixin):
 class VLANInterfaceForm(InterfaceForm):
     """Form used to create/edit a VLAN interface."""
 
+    _parent_count_range = (1, 1)
+    _parent_count_error = "A VLAN interface must have exactly one parent."
+    _forbidden_parent_types = frozenset({INTERFACE_TYPE.VLAN})
+    _forbidden_parent_type_error = (
+        "A VLAN interface can't have another VLAN interface as parent."
+    )
+    _forbidden_sibling_types = frozenset({INTERFACE_TYPE.BOND})
+    _forbidden_sibling_error = (
+        "A VLAN interface can't have a parent that is already in a bond."
+    )
+
     class Meta:
         model = VLANInterface
         fields = InterfaceForm.Meta.fields
 
-    def clean_parents(self):
-        parents = self.get_clean_parents()
-        if parents is None:
-            return
-        if len(parents) != 1:
-            raise ValidationError(
-                "A VLAN interface must have exactly one parent."
-            )
-        if parents[0].type == INTERFACE_TYPE.VLAN:
-            raise ValidationError(
-                "A VLAN interface can't have another VLAN interface as "
-                "parent."
-            )
-        parent_has_bond_children = [
-            rel.child
-            for rel in parents[0].children_relationships.all()
-            if rel.child.type == INTERFACE_TYPE.BOND
-        ]
-        if parent_has_bond_children:
-            raise ValidationError(
-                "A VLAN interface can't have a parent that is already "
-                "in a bond."
-            )
-        return parents
-
     def clean_vlan(self):
         created = self.instance.id is None
         new_vlan = self.cleaned_data.get("vlan")
@@ -413,9 +472,7 @@ class VLANInterfaceForm(InterfaceForm):
                         "A VLAN interface can only belong to a tagged VLAN on "
                         "the same fabric as its parent interface.",
                     )
-                name = build_vlan_interface_name(
-                    self.cleaned_data.get("parents").first(), new_vlan
-                )
+                name = build_vlan_interface_name(parent, new_vlan)
                 self.clean_interface_name_uniqueness(name)
         return cleaned_data
 
@@ -426,51 +483,37 @@ class ChildInterfaceForm(InterfaceForm):
     bridges.
     """
 
-    def clean_parents(self):
-        """Validate that child interfaces cannot be created unless at least one
-        parent is present.
-        """
-        parents = self.get_clean_parents()
-        if parents is None:
-            return
-        # Ensure support for parthenogenesis.
-        if len(parents) < 1:
-            raise ValidationError(
-                "A %s interface must have one or more parents."
-                % self.Meta.model.get_type()
-            )
-        return parents
+    # Child interfaces cannot be created unless at least one parent is
+    # present.
+    _parent_count_range = (1, None)
+    _parent_count_error = "A %(type)s interface must have one or more parents."
 
     def _set_default_child_mac(self, parents):
         """Sets the value of self.cleaned_data['mac_address'] based on either
         the first parent (if the child interface is new), or a remaining parent
         (if a parent with the current MAC was removed).
         """
-        if self.instance.id is not None:
+        instance_mac = self.instance.mac_address
+        if self.instance.id is None:
+            if "mac_address" not in self.data:
+                # New bond without mac_address set, set it to the first
+                # parent mac_address.
+                self.cleaned_data["mac_address"] = str(parents[0].mac_address)
+        elif self.cleaned_data["mac_address"] == instance_mac:
+            # The current parents only matter when the MAC address is kept.
             parent_macs = {
                 parent.mac_address.get_raw(): parent
                 for parent in self.instance.parents.all()
             }
-        else:
-            parent_macs = {}
-        mac_not_changed = (
-            self.instance.id is not None
-            and self.cleaned_data["mac_address"] == self.instance.mac_address
-        )
-        if self.instance.id is None and "mac_address" not in self.data:
-            # New bond without mac_address set, set it to the first
-            # parent mac_address.
-            self.cleaned_data["mac_address"] = str(parents[0].mac_address)
-        elif (
-            mac_not_changed
-            and self.instance.mac_address in parent_macs
-            and parent_macs[self.instance.mac_address] not in parents
-        ):
-            # Updating child where its mac_address comes from its parent
-            # and that parent is no longer part of this child. Update
-            # the mac_address to be one of the new parent MAC
-            # addresses.
-            self.cleaned_data["mac_address"] = str(parents[0].mac_address)
+            if (
+                instance_mac in parent_macs
+                and parent_macs[instance_mac] not in parents
+            ):
+                # Updating child where its mac_address comes from its parent
+                # and that parent is no longer part of this child. Update
+                # the mac_address to be one of the new parent MAC
+                # addresses.
+                self.cleaned_data["mac_address"] = str(parents[0].mac_address)
 
     def _set_default_vlan(self, parents):
         """When creating the child, set VLAN to the same as the first parent
@@ -485,11 +528,12 @@ class ChildInterfaceForm(InterfaceForm):
     def get_delinquent_children(self, parents):
         """Returns either an empty set, or a set of children whose presence
         would deter the parent from adopting this new child."""
+        instance_id = self.instance.id
         return {
             parent.name
             for parent in parents
             for rel in parent.children_relationships.all()
-            if rel.child.id != self.instance.id
+            if rel.child_id != instance_id
         }
 
     def validate_parental_fidelity(self, parents):
@@ -576,8 +620,10 @@ class BondInterfaceForm(ChildInterfaceForm):
         # and check that the parents all belong to the same VLAN.
         if self.instance.id is None:
             vlan = self.cleaned_data.get("vlan")
-            parent_vlans = {parent.vlan for parent in parents}
-            if parent_vlans != set([vlan]):
+            vlan_id = None if vlan is None else vlan.id
+            # Compare the IDs that are on the parent rows rather than
+            # fetching the VLAN of each parent.
+            if any(parent.vlan_id != vlan_id for parent in parents):
                 set_form_error(
                     self,
                     "parents",
@@ -587,27 +633,28 @@ class BondInterfaceForm(ChildInterfaceForm):
     def set_extra_parameters(self, interface, created):
         """Set the bond parameters as well."""
         super().set_extra_parameters(interface, created)
-        # Set all the bond_* parameters.
-        bond_fields = [
-            field_name
-            for field_name in self.fields
-            if field_name.startswith("bond_")
-        ]
-        for bond_field in bond_fields:
+        # Set all the bond_* parameters. The params are assigned back once,
+        # as every assignment is tracked (and copied) by CleanSave.
+        params = interface.params.copy()
+        for bond_field, initial in self._bond_field_initials.items():
             value = self.cleaned_data.get(bond_field)
-            params = interface.params.copy()
-            if (
-                value is not None
-                and isinstance(value, str)
-                and len(value) > 0
-                and not value.isspace()
-            ):
-                params[bond_field] = value
-            elif value is not None and not isinstance(value, str):
+            if isinstance(value, str) and (not value or value.isspace()):
+                # A blank choice is the same as not providing one.
+                value = None
+            if value is not None:
                 params[bond_field] = value
             elif created:
-                params[bond_field] = self.fields[bond_field].initial
-            interface.params = params
+                params[bond_field] = initial
+        interface.params = params
+
+
+# The bond_* fields and their initial values, collected once rather than on
+# every save.
+BondInterfaceForm._bond_field_initials = {
+    field_name: field.initial
+    for field_name, field in BondInterfaceForm.base_fields.items()
+    if field_name.startswith("bond_")
+}
 
 
 class BridgeInterfaceForm(ChildInterfaceForm):
@@ -630,48 +677,37 @@ class BridgeInterfaceForm(ChildInterfaceForm):
         min_value=0, initial=DEFAULT_BRIDGE_FD, required=False
     )
 
+    _parent_count_range = (1, 1)
+    _parent_count_error = "A bridge interface must have exactly one parent."
+    _forbidden_parent_types = frozenset({INTERFACE_TYPE.BRIDGE})
+    _forbidden_parent_type_error = (
+        "A bridge interface can't have another bridge interface as parent."
+    )
+    _forbidden_sibling_types = frozenset(
+        {INTERFACE_TYPE.BOND, INTERFACE_TYPE.BRIDGE}
+    )
+    _forbidden_sibling_error = (
+        "A bridge interface can't have a parent that is already in a bond "
+        "or a bridge."
+    )
+
     class Meta:
         model = BridgeInterface
         fields = InterfaceForm.Meta.fields + ("mac_address", "name")
 
-    def clean_parents(self):
-        parents = self.get_clean_parents()
-        if parents is None:
-            return
-        if len(parents) != 1:
-            raise ValidationError(
-                "A bridge interface must have exactly one parent."
-            )
-        if parents[0].type == INTERFACE_TYPE.BRIDGE:
-            raise ValidationError(
-                "A bridge interface can't have another bridge interface as "
-                "parent."
-            )
-        instance_id = None if self.instance is None else self.instance.id
-        bond_or_bridge = {INTERFACE_TYPE.BOND, INTERFACE_TYPE.BRIDGE}
-        parent_has_bad_children = any(
-            rel.child.type in bond_or_bridge and rel.child.id != instance_id
-            for rel in parents[0].children_relationships.all()
-        )
-        if parent_has_bad_children:
-            raise ValidationError(
-                "A bridge interface can't have a parent that is already "
-                "in a bond or a bridge."
-            )
-        return parents
-
     def get_delinquent_children(self, parents):
         """Returns a set of children who would prevent the creation of this
         bridge interface. The only difference between this method and the
         method it overrides is that it allows VLAN interface children, whom
         bridges may get along with.
         """
+        instance_id = self.instance.id
         return {
             parent.name
             for parent in parents
             for rel in parent.children_relationships.all()
             if (
-                rel.child.id != self.instance.id
+                rel.child_id != instance_id
                 and rel.child.type != INTERFACE_TYPE.VLAN
             )
         }
@@ -691,27 +727,28 @@ class BridgeInterfaceForm(ChildInterfaceForm):
     def set_extra_parameters(self, interface, created):
         """Set the bridge parameters as well."""
         super().set_extra_parameters(interface, created)
-        # Set all the bridge_* parameters.
-        bridge_fields = [
-            field_name
-            for field_name in self.fields
-            if field_name.startswith("bridge_")
-        ]
-        for bridge_field in bridge_fields:
+        # Set all the bridge_* parameters. The params are assigned back once,
+        # as every assignment is tracked (and copied) by CleanSave.
+        params = interface.params.copy()
+        for bridge_field, initial in self._bridge_field_initials.items():
             value = self.cleaned_data.get(bridge_field)
-            params = interface.params.copy()
-            if (
-                value is not None
-                and isinstance(value, str)
-                and len(value) > 0
-                and not value.isspace()
-            ):
-                params[bridge_field] = value
-            elif value is not None and not isinstance(value, str):
+            if isinstance(value, str) and (not value or value.isspace()):
+                # A blank choice is the same as not providing one.
+                value = None
+            if value is not None:
                 params[bridge_field] = value
             elif created:
-                params[bridge_field] = self.fields[bridge_field].initial
-            interface.params = params
+                params[bridge_field] = initial
+        interface.params = params
+
+
+# The bridge_* fields and their initial values, collected once rather than on
+# every save.
+BridgeInterfaceForm._bridge_field_initials = {
+    field_name: field.initial
+    for field_name, field in BridgeInterfaceForm.base_fields.items()
+    if field_name.startswith("bridge_")
+}
 
 
 class AcquiredBridgeInterfaceForm(BridgeInterfaceForm):
@@ -756,7 +793,7 @@ class AcquiredBridgeInterfaceForm(BridgeInterfaceForm):
         # When no IP address has been assigned to the parent we ensure that
         # its at least in LINK_UP mode.
         interface.ensure_link_up()
-        return Interface.objects.get(id=interface.id)
+        return interface
 
 
 INTERFACE_FORM_MAPPING = {
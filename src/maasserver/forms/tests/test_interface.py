@@ -25,10 +25,15 @@ from maasserver.forms.interface import (
     PhysicalInterfaceForm,
     VLANInterfaceForm,
 )
-from maasserver.models.interface import build_vlan_interface_name
+from maasserver.models.interface import (
+    build_vlan_interface_name,
+    InterfaceRelationship,
+)
 from maasserver.testing.factory import factory
 from maasserver.testing.testcase import MAASServerTestCase
 from maasserver.utils.forms import compose_invalid_choice_text
+from maasserver.utils.orm import reload_object
+from maastesting.djangotestcase import count_queries
 
 
 class GetInterfaceFormTests(MAASServerTestCase):
@@ -224,6 +229,19 @@ class TestPhysicalInterfaceForm(MAASServerTestCase):
             ),
         )
 
+    def test_updates_interface_without_parents(self):
+        interface = factory.make_Interface(INTERFACE_TYPE.PHYSICAL)
+        new_name = factory.make_name("eth")
+        form = PhysicalInterfaceForm(
+            instance=interface, data={"name": new_name}
+        )
+        self.assertTrue(form.is_valid(), dict(form.errors))
+        # The existing, empty, parents are validated when none are given.
+        self.assertItemsEqual([], form.cleaned_data["parents"])
+        interface = form.save()
+        self.assertEqual(new_name, interface.name)
+        self.assertItemsEqual([], interface.parents.all())
+
     def test_updates_interface_errors_for_not_link_connected_and_speed(self):
         interface = factory.make_Interface(
             INTERFACE_TYPE.PHYSICAL, name="eth0", link_connected=False
@@ -885,6 +903,38 @@ class BondInterfaceFormTest(MAASServerTestCase):
         )
         self.assertItemsEqual([parent1, parent2], interface.parents.all())
 
+    def count_queries_validating_parents(self, num_parents):
+        """Return the number of queries performed validating a new bond with
+        `num_parents` parents."""
+        vlan = factory.make_VLAN(vid=10)
+        parents = [factory.make_Interface(INTERFACE_TYPE.PHYSICAL, vlan=vlan)]
+        for _ in range(num_parents - 1):
+            parents.append(
+                factory.make_Interface(
+                    INTERFACE_TYPE.PHYSICAL, node=parents[0].node, vlan=vlan
+                )
+            )
+        form = BondInterfaceForm(
+            node=parents[0].node,
+            data={
+                "name": factory.make_name(),
+                "vlan": vlan.id,
+                "parents": [parent.id for parent in parents],
+            },
+        )
+        num_queries, is_valid = count_queries(form.is_valid)
+        self.assertTrue(is_valid, dict(form.errors))
+        return num_queries
+
+    def test_validate_num_queries_is_independent_of_num_parents(self):
+        num_queries_two = self.count_queries_validating_parents(2)
+        num_queries_five = self.count_queries_validating_parents(5)
+        self.assertEqual(
+            num_queries_two,
+            num_queries_five,
+            "Number of queries has changed; make sure this is expected.",
+        )
+
     def test_create_removes_parent_links_and_sets_link_up_on_bond(self):
         vlan = factory.make_VLAN(vid=10)
         parent1 = factory.make_Interface(INTERFACE_TYPE.PHYSICAL, vlan=vlan)
@@ -1166,6 +1216,83 @@ class BondInterfaceFormTest(MAASServerTestCase):
         )
         self.assertItemsEqual([parent1, parent2], interface.parents.all())
 
+    def test_edits_interface_adds_and_removes_parents(self):
+        parent1 = factory.make_Interface(INTERFACE_TYPE.PHYSICAL)
+        parent2 = factory.make_Interface(
+            INTERFACE_TYPE.PHYSICAL, node=parent1.node
+        )
+        parent3 = factory.make_Interface(
+            INTERFACE_TYPE.PHYSICAL, node=parent1.node
+        )
+        new_parent1 = factory.make_Interface(
+            INTERFACE_TYPE.PHYSICAL, node=parent1.node
+        )
+        new_parent2 = factory.make_Interface(
+            INTERFACE_TYPE.PHYSICAL, node=parent1.node
+        )
+        interface = factory.make_Interface(
+            INTERFACE_TYPE.BOND, parents=[parent1, parent2, parent3]
+        )
+        form = BondInterfaceForm(
+            instance=interface,
+            data={"parents": [parent1.id, new_parent1.id, new_parent2.id]},
+        )
+        self.assertTrue(form.is_valid(), dict(form.errors))
+        interface = form.save()
+        self.assertItemsEqual(
+            [parent1, new_parent1, new_parent2], interface.parents.all()
+        )
+        # The new relationships are bulk created, which bypasses
+        # TimestampedModel.save(), so the timestamps are set by the form.
+        new_rels = InterfaceRelationship.objects.filter(
+            child=interface, parent__in=[new_parent1, new_parent2]
+        )
+        self.assertEqual(2, len(new_rels))
+        for rel in new_rels:
+            self.assertIsNotNone(rel.created)
+            self.assertIsNotNone(rel.updated)
+
+    def count_queries_replacing_parents(self, num_replaced):
+        """Replace `num_replaced` of the 4 parents of a bond and return the
+        number of queries performed by saving the form."""
+        parents = [factory.make_Interface(INTERFACE_TYPE.PHYSICAL)]
+        node = parents[0].node
+        for _ in range(3):
+            parents.append(
+                factory.make_Interface(INTERFACE_TYPE.PHYSICAL, node=node)
+            )
+        new_parents = [
+            factory.make_Interface(INTERFACE_TYPE.PHYSICAL, node=node)
+            for _ in range(num_replaced)
+        ]
+        interface = factory.make_Interface(
+            INTERFACE_TYPE.BOND,
+            mac_address=parents[0].mac_address,
+            parents=parents,
+        )
+        kept_parents = parents[: len(parents) - num_replaced]
+        form = BondInterfaceForm(
+            instance=interface,
+            data={
+                "parents": [parent.id for parent in kept_parents + new_parents]
+            },
+        )
+        self.assertTrue(form.is_valid(), dict(form.errors))
+        num_queries, interface = count_queries(form.save)
+        self.assertItemsEqual(
+            kept_parents + new_parents, interface.parents.all()
+        )
+        return num_queries
+
+    def test_save_num_queries_is_independent_of_num_parents_changed(self):
+        num_queries_one = self.count_queries_replacing_parents(1)
+        num_queries_three = self.count_queries_replacing_parents(3)
+        self.assertEqual(
+            num_queries_one,
+            num_queries_three,
+            "Number of queries has changed; make sure this is expected.",
+        )
+
     def test_edits_interface_updates_mac_address_when_parent_removed(self):
         parent1 = factory.make_Interface(INTERFACE_TYPE.PHYSICAL)
         parent2 = factory.make_Interface(
@@ -1385,6 +1512,33 @@ class BridgeInterfaceFormTest(MAASServerTestCase):
         self.assertEqual(interface.mac_address, parent.mac_address)
         self.assertItemsEqual([parent], interface.parents.all())
 
+    def count_queries_validating_parent(self, num_children):
+        """Return the number of queries performed validating a new bridge on
+        a parent that has `num_children` VLAN interfaces."""
+        parent = factory.make_Interface(INTERFACE_TYPE.PHYSICAL)
+        for _ in range(num_children):
+            factory.make_Interface(INTERFACE_TYPE.VLAN, parents=[parent])
+        form = BridgeInterfaceForm(
+            node=parent.node,
+            data={"name": factory.make_name(), "parents": [parent.id]},
+        )
+        num_queries, is_valid = count_queries(form.is_valid)
+        self.assertTrue(is_valid, dict(form.errors))
+        return num_queries
+
+    def test_validate_num_queries_is_independent_of_num_parent_children(
+        self,
+    ):
+        # A bridge has exactly one parent, so vary the number of children
+        # of that parent, which are walked by the parent checks.
+        num_queries_two = self.count_queries_validating_parent(2)
+        num_queries_five = self.count_queries_validating_parent(5)
+        self.assertEqual(
+            num_queries_two,
+            num_queries_five,
+            "Number of queries has changed; make sure this is expected.",
+        )
+
     def test_allows_bridge_on_parent_with_vlan_bridges(self):
         parent = factory.make_Interface(INTERFACE_TYPE.PHYSICAL)
         vlan1 = factory.make_Interface(INTERFACE_TYPE.VLAN, parents=[parent])
@@ -1759,6 +1913,34 @@ class AcquiredBridgeInterfaceFormTest(MAASServerTestCase):
         self.assertItemsEqual([parent_sip], interface.ip_addresses.all())
         self.assertItemsEqual([], parent.ip_addresses.all())
 
+    def test_creates_acquired_bridge_on_parent_with_gateway_link(self):
+        node = factory.make_Node()
+        parent_vlan = factory.make_Fabric().get_default_vlan()
+        parent = factory.make_Interface(
+            INTERFACE_TYPE.PHYSICAL, node=node, vlan=parent_vlan
+        )
+        parent_subnet = factory.make_Subnet(
+            vlan=parent_vlan, cidr=factory.make_ipv4_network()
+        )
+        parent_sip = factory.make_StaticIPAddress(
+            alloc_type=IPADDRESS_TYPE.STICKY,
+            ip=factory.pick_ip_in_Subnet(parent_subnet),
+            subnet=parent_subnet,
+            interface=parent,
+        )
+        node.gateway_link_ipv4 = parent_sip
+        node.save()
+        form = AcquiredBridgeInterfaceForm(
+            node=node,
+            data={"name": factory.make_name("br"), "parents": [parent.id]},
+        )
+        self.assertTrue(form.is_valid(), dict(form.errors))
+        interface = form.save()
+        self.assertItemsEqual([parent_sip], interface.ip_addresses.all())
+        self.assertItemsEqual([], parent.ip_addresses.all())
+        # Moving the IP address off the parent drops the gateway link.
+        self.assertIsNone(reload_object(node).gateway_link_ipv4)
+
     def test_rejects_no_parent(self):
         interface_name = factory.make_name()
         form = AcquiredBridgeInterfaceForm(
@@ -118,16 +118,20 @@ def update_lease(
         # Do nothing.
         return {}
 
-    interfaces = list(Interface.objects.filter(mac_address=mac))
-    if len(interfaces) == 0 and action == "commit":
+    # Only the IDs are needed to filter and link the addresses, so don't
+    # load the whole interface rows.
+    interface_ids = list(
+        Interface.objects.filter(mac_address=mac).values_list("id", flat=True)
+    )
+    if len(interface_ids) == 0 and action == "commit":
         # A MAC address that is unknown to MAAS was given an IP address. Create
         # an unknown interface for this lease.
         unknown_interface = UnknownInterface(
             name="eth0", mac_address=mac, vlan_id=subnet.vlan_id
         )
         unknown_interface.save()
-        interfaces = [unknown_interface]
-    elif len(interfaces) == 0:
+        interface_ids = [unknown_interface.id]
+    elif len(interface_ids) == 0:
         # No interfaces and not commit action so nothing needs to be done.
         return {}
 
@@ -138,7 +142,7 @@ def update_lease(
         subnet_family
     )
     old_family_addresses = old_family_addresses.filter(
-        alloc_type=IPADDRESS_TYPE.DISCOVERED, interface__in=interfaces
+        alloc_type=IPADDRESS_TYPE.DISCOVERED, interface__in=interface_ids
     )
     for address in old_family_addresses:
         # Release old DHCP hostnames, but only for obsolete dynamic addresses.
@@ -174,8 +178,8 @@ def update_lease(
             alloc_type=IPADDRESS_TYPE.DISCOVERED,
             ip=ip,
         )
-        for interface in interfaces:
-            interface.ip_addresses.add(sip)
+        # Link all interfaces with the MAC address in one go.
+        sip.interface_set.add(*interface_ids)
         if sip_hostname is not None:
             # MAAS automatically manages DNS for node hostnames, so we cannot
             # allow a DHCP client to override that.
@@ -198,7 +202,7 @@ def update_lease(
                 alloc_type=IPADDRESS_TYPE.DISCOVERED,
                 ip=None,
                 subnet=subnet,
-                interface__in=interfaces,
+                interface__in=interface_ids,
             ).first()
             if sip is None:
                 sip = StaticIPAddress.objects.create(
@@ -209,6 +213,5 @@ def update_lease(
         else:
             sip.ip = None
             sip.save()
-        for interface in interfaces:
-            interface.ip_addresses.add(sip)
+        sip.interface_set.add(*interface_ids)
     return {}
@@ -4,8 +4,6 @@
 """Tests for the UbuntuOS module."""
 
 
-from itertools import product
-
 from maastesting.factory import factory
 from maastesting.testcase import MAASTestCase
 from provisioningserver.drivers.osystem import BOOT_IMAGE_PURPOSE
@@ -15,18 +13,15 @@ from provisioningserver.drivers.osystem.caringo import CaringoOS
 class TestCaringoOS(MAASTestCase):
     def test_get_boot_image_purposes(self):
         osystem = CaringoOS()
-        archs = [factory.make_name("arch") for _ in range(2)]
-        subarchs = [factory.make_name("subarch") for _ in range(2)]
-        releases = [factory.make_name("release") for _ in range(2)]
-        labels = [factory.make_name("label") for _ in range(2)]
-        for arch, subarch, release, label in product(
-            archs, subarchs, releases, labels
-        ):
-            expected = osystem.get_boot_image_purposes(
-                arch, subarchs, release, label
-            )
-            self.assertIsInstance(expected, list)
-            self.assertEqual(expected, [BOOT_IMAGE_PURPOSE.EPHEMERAL])
+        arch = factory.make_name("arch")
+        subarch = factory.make_name("subarch")
+        release = factory.make_name("release")
+        label = factory.make_name("label")
+        expected = osystem.get_boot_image_purposes(
+            arch, subarch, release, label
+        )
+        self.assertIsInstance(expected, list)
+        self.assertEqual(expected, [BOOT_IMAGE_PURPOSE.EPHEMERAL])
 
     def test_get_default_release(self):
         osystem = CaringoOS()
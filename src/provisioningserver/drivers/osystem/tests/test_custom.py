@@ -4,7 +4,6 @@
 """Tests for the Custom module."""
 
 
-from itertools import product
 import os
 
 from maastesting.factory import factory
@@ -37,18 +36,15 @@ class TestCustomOS(MAASTestCase):
 
     def test_get_boot_image_purposes(self):
         osystem = CustomOS()
-        archs = [factory.make_name("arch") for _ in range(2)]
-        subarchs = [factory.make_name("subarch") for _ in range(2)]
-        releases = [factory.make_name("release") for _ in range(2)]
-        labels = [factory.make_name("label") for _ in range(2)]
-        for arch, subarch, release, label in product(
-            archs, subarchs, releases, labels
-        ):
-            expected = osystem.get_boot_image_purposes(
-                arch, subarchs, release, label
-            )
-            self.assertIsInstance(expected, list)
-            self.assertEqual(expected, [BOOT_IMAGE_PURPOSE.XINSTALL])
+        arch = factory.make_name("arch")
+        subarch = factory.make_name("subarch")
+        release = factory.make_name("release")
+        label = factory.make_name("label")
+        expected = osystem.get_boot_image_purposes(
+            arch, subarch, release, label
+        )
+        self.assertIsInstance(expected, list)
+        self.assertEqual(expected, [BOOT_IMAGE_PURPOSE.XINSTALL])
 
     def test_get_default_release(self):
         osystem = CustomOS()
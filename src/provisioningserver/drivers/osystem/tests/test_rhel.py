@@ -4,8 +4,6 @@
 """Tests for the RHEL module."""
 
 
-from itertools import product
-
 from testtools.matchers import Equals
 
 from maastesting.factory import factory
@@ -20,18 +18,15 @@ from provisioningserver.drivers.osystem.rhel import (
 class TestRHEL(MAASTestCase):
     def test_get_boot_image_purposes(self):
         osystem = RHELOS()
-        archs = [factory.make_name("arch") for _ in range(2)]
-        subarchs = [factory.make_name("subarch") for _ in range(2)]
-        releases = [factory.make_name("release") for _ in range(2)]
-        labels = [factory.make_name("label") for _ in range(2)]
-        for arch, subarch, release, label in product(
-            archs, subarchs, releases, labels
-        ):
-            expected = osystem.get_boot_image_purposes(
-                arch, subarchs, release, label
-            )
-            self.assertIsInstance(expected, list)
-            self.assertEqual(expected, [BOOT_IMAGE_PURPOSE.XINSTALL])
+        arch = factory.make_name("arch")
+        subarch = factory.make_name("subarch")
+        release = factory.make_name("release")
+        label = factory.make_name("label")
+        expected = osystem.get_boot_image_purposes(
+            arch, subarch, release, label
+        )
+        self.assertIsInstance(expected, list)
+        self.assertEqual(expected, [BOOT_IMAGE_PURPOSE.XINSTALL])
 
     def test_get_default_release(self):
         osystem = RHELOS()
@@ -4,7 +4,6 @@
 """Tests for the UbuntuOS module."""
 
 
-from itertools import product
 import random
 
 from distro_info import UbuntuDistroInfo
@@ -32,26 +31,23 @@ class TestUbuntuOS(MAASTestCase):
 
     def test_get_boot_image_purposes(self):
         osystem = UbuntuOS()
-        archs = [factory.make_name("arch") for _ in range(2)]
-        subarchs = [factory.make_name("subarch") for _ in range(2)]
-        releases = [factory.make_name("release") for _ in range(2)]
-        labels = [factory.make_name("label") for _ in range(2)]
-        for arch, subarch, release, label in product(
-            archs, subarchs, releases, labels
-        ):
-            expected = osystem.get_boot_image_purposes(
-                arch, subarchs, release, label
-            )
-            self.assertIsInstance(expected, list)
-            self.assertEqual(
-                expected,
-                [
-                    BOOT_IMAGE_PURPOSE.COMMISSIONING,
-                    BOOT_IMAGE_PURPOSE.INSTALL,
-                    BOOT_IMAGE_PURPOSE.XINSTALL,
-                    BOOT_IMAGE_PURPOSE.DISKLESS,
-                ],
-            )
+        arch = factory.make_name("arch")
+        subarch = factory.make_name("subarch")
+        release = factory.make_name("release")
+        label = factory.make_name("label")
+        expected = osystem.get_boot_image_purposes(
+            arch, subarch, release, label
+        )
+        self.assertIsInstance(expected, list)
+        self.assertEqual(
+            expected,
+            [
+                BOOT_IMAGE_PURPOSE.COMMISSIONING,
+                BOOT_IMAGE_PURPOSE.INSTALL,
+                BOOT_IMAGE_PURPOSE.XINSTALL,
+                BOOT_IMAGE_PURPOSE.DISKLESS,
+            ],
+        )
 
     def test_is_release_supported(self):
         osystem = UbuntuOS()